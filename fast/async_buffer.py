@@ -1,7 +1,7 @@
 import asyncio
 import os
 
-from .utils import ServerwiseContext
+from .utils import ServerwiseContext, TokenBucket
 
 
 async def poll_every(
@@ -26,6 +26,7 @@ async def buffered_reader(
     *,
     chunk_size: int = 1024,
     poll=None,
+    bucket: TokenBucket = None,
 ):
 
     while_ = lambda: ctx.bytes_sent < size and loop.time() < (
@@ -35,7 +36,20 @@ async def buffered_reader(
     if poll is not None:
         loop.create_task(poll_every(ctx, loop, poll, while_))
 
+    paced = 0.0
+
     while while_():
+        if bucket is not None:
+            paced_at = loop.time()
+
+            await bucket.consume(
+                min(size - ctx.bytes_sent, chunk_size),
+                loop,
+                until=start + ctx.bytes_sent_span,
+            )
+
+            paced += loop.time() - paced_at
+
         pending_bytes = await asyncio.to_thread(
             os.urandom, min(size - ctx.bytes_sent, chunk_size)
         )
@@ -46,6 +60,6 @@ async def buffered_reader(
             ctx.bytes_sent_start = loop.time()
 
         if not ctx.upload_latency:
-            ctx.upload_latency = loop.time() - start
+            ctx.upload_latency = loop.time() - start - paced
 
     future.set_result(True)
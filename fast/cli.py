@@ -1,10 +1,12 @@
 import asyncio
+import socket
 import sys
 
 import click
 from rich.console import Console
 from rich.traceback import install
 
+from .exporter import MetricsExporter
 from .speedtest import FastClientSpeedTestRich
 
 install(show_locals=True, word_wrap=True, suppress=[click])
@@ -28,6 +30,13 @@ def into_asyncio_run(f):
     help="Download byte limit for testing. (0 for disabling)",
     type=click.IntRange(0, 26843545600, max_open=True, clamp=True),
 )
+@click.option(
+    "-ss",
+    "--stripe-size",
+    default=4194304,
+    help="Byte size of each download range handed out from the download limit.",
+    type=click.IntRange(1, 26214400, clamp=True),
+)
 @click.option(
     "-ull",
     "--upload-limit",
@@ -51,6 +60,20 @@ def into_asyncio_run(f):
 @click.option(
     "-t", "--time-limit", default=10.0, help="Time limit for testing.", type=float
 )
+@click.option(
+    "-r",
+    "--rate-limit",
+    default=0,
+    help="Byte rate per second to pace testing at. (0 for disabling)",
+    type=click.IntRange(0),
+)
+@click.option(
+    "-af",
+    "--address-families",
+    default=None,
+    type=click.Choice(["parallel", "sequential"]),
+    help="Measure IPv4 and IPv6 separately, in parallel or one after another.",
+)
 @click.option(
     "-8",
     "--bits",
@@ -75,17 +98,41 @@ def into_asyncio_run(f):
     is_flag=True,
     help="Go minimal with minimalistic mode.",
 )
+@click.option(
+    "-e",
+    "--exporter-port",
+    default=None,
+    type=click.IntRange(1, 65535),
+    help="Serve Prometheus metrics on this port and test repeatedly.",
+)
+@click.option(
+    "--exporter-host",
+    default="127.0.0.1",
+    help="Address to serve Prometheus metrics on.",
+)
+@click.option(
+    "--exporter-interval",
+    default=60.0,
+    type=float,
+    help="Seconds to wait between tests in exporter mode.",
+)
 @into_asyncio_run
 async def __fastcom_speedtesting__(
     download_limit: int,
+    stripe_size: int,
     upload_limit: int,
     url_count: int,
     connections: int,
     time_limit: float,
+    rate_limit: int,
+    address_families: str,
     bits: bool,
     private: bool,
     share: bool,
     minimalist: bool,
+    exporter_port: int,
+    exporter_host: str,
+    exporter_interval: float,
 ):
 
     sys.stderr = sys.__stderr__
@@ -95,36 +142,77 @@ async def __fastcom_speedtesting__(
 
     console = Console(stderr=True)
 
-    fastcom_client = FastClientSpeedTestRich(
-        console=console,
-        bits=bits,
-        private=private,
-        share=share,
-        less_verbose=minimalist,
-    )
-
-    data = await fastcom_client.fastcom_client.fetch_urls(url_count=url_count)
-    client = data["client"]
+    async def speedtest(exporter: MetricsExporter = None):
+        fastcom_client = FastClientSpeedTestRich(
+            console=console,
+            bits=bits,
+            private=private,
+            share=share,
+            less_verbose=minimalist,
+        )
 
-    if not private and not minimalist:
+        try:
+            data = await fastcom_client.fastcom_client.fetch_urls(url_count=url_count)
+            client = data["client"]
+
+            if not private and not minimalist:
+                console.print(
+                    f"Server reported client @ {client['location']['city']}, {client['location']['country']} [{client['ip']}]."
+                )
+
+            targets = data["targets"]
+
+            if exporter is not None:
+                exporter.start_run(fastcom_client)
+
+            await (
+                fastcom_client.run(
+                    targets=targets,
+                    connections=connections,
+                    do_download=download_limit > 0,
+                    do_upload=upload_limit > 0,
+                    download_size=download_limit,
+                    download_stripe_size=stripe_size,
+                    upload_size=upload_limit,
+                    download_time_limit=time_limit,
+                    upload_time_limit=time_limit,
+                    rate_limit=rate_limit,
+                    families=(socket.AF_INET, socket.AF_INET6)
+                    if address_families
+                    else (),
+                    families_in_parallel=address_families != "sequential",
+                )
+            )
+        except Exception:
+            await fastcom_client.reset_metrics()
+            await fastcom_client.session.close()
+            raise
+
+        if exporter is not None:
+            exporter.finish_run()
+
+    if exporter_port is None:
+        return await speedtest()
+
+    exporter = MetricsExporter(exporter_host, exporter_port, private=private)
+    await exporter.start()
+
+    if not minimalist:
         console.print(
-            f"Server reported client @ {client['location']['city']}, {client['location']['country']} [{client['ip']}]."
+            f"Serving metrics on http://{exporter_host}:{exporter_port}/metrics."
         )
 
-    targets = data["targets"]
-
-    await (
-        fastcom_client.run(
-            targets=targets,
-            connections=connections,
-            do_download=download_limit > 0,
-            do_upload=upload_limit > 0,
-            download_size=download_limit,
-            upload_size=upload_limit,
-            download_time_limit=time_limit,
-            upload_time_limit=time_limit,
-        )
-    )
+    try:
+        while True:
+            try:
+                await speedtest(exporter)
+            except Exception:
+                console.print_exception()
+                exporter.finish_run(success=False)
+
+            await asyncio.sleep(exporter_interval)
+    finally:
+        await exporter.stop()
 
 
 if __name__ == "__main__":
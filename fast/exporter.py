@@ -0,0 +1,236 @@
+import typing as t
+
+from aiohttp import web
+
+from .utils import ADDRESS_FAMILIES
+
+if t.TYPE_CHECKING:
+    from .speedtest import FastClientSpeedtest
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+CLIENT_BOUND_LAG = 0.1
+
+METRICS = {
+    "fast_speed_bytes_per_second": ("gauge", "Average throughput of the run."),
+    "fast_family_speed_bytes_per_second": (
+        "gauge",
+        "Average throughput of the run per address family.",
+    ),
+    "fast_family_available": (
+        "gauge",
+        "Whether the address family could be measured during the run.",
+    ),
+    "fast_peak_speed_bytes_per_second": ("gauge", "Peak throughput of the run."),
+    "fast_transferred_bytes": ("gauge", "Bytes transferred during the run."),
+    "fast_latency_seconds": ("gauge", "Server response time per connection."),
+    "fast_pace_target_bytes_per_second": ("gauge", "Target rate of a paced run."),
+    "fast_pace_held": ("gauge", "Whether a paced run held its target rate."),
+    "fast_loaded_latency_seconds": (
+        "gauge",
+        "Average server response time under load of a paced run.",
+    ),
+    "fast_jitter_seconds": (
+        "gauge",
+        "Average latency jitter under load of a paced run.",
+    ),
+    "fast_lost_probes": ("gauge", "Latency probes lost during a paced run."),
+    "fast_event_loop_lag_seconds": (
+        "gauge",
+        "Highest event loop lag observed during the run.",
+    ),
+    "fast_client_bound": (
+        "gauge",
+        "Whether the client itself was likely the bottleneck of the run.",
+    ),
+    "fast_run_in_progress": ("gauge", "Whether a run is currently in progress."),
+    "fast_last_run_success": ("gauge", "Whether the last run finished without errors."),
+    "fast_runs_total": ("counter", "Number of finished runs, successful or not."),
+}
+
+
+def format_labels(labels: dict):
+    if not labels:
+        return ""
+
+    return (
+        "{"
+        + ",".join(
+            '{}="{}"'.format(
+                key,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for key, value in labels.items()
+        )
+        + "}"
+    )
+
+
+def collect_samples(speedtest: "FastClientSpeedtest", run: str, private: bool):
+    samples = {}
+
+    def add(name, value, **labels):
+        samples.setdefault(name, []).append(({"run": run, **labels}, value))
+
+    for direction, speed, peak, attribute, latency_attribute in (
+        (
+            "download",
+            speedtest.download_speed,
+            speedtest.peak_download_speed,
+            "bytes_recv",
+            "download_latency",
+        ),
+        (
+            "upload",
+            speedtest.upload_speed,
+            speedtest.peak_upload_speed,
+            "bytes_sent",
+            "upload_latency",
+        ),
+    ):
+        add("fast_speed_bytes_per_second", speed, direction=direction)
+        add("fast_peak_speed_bytes_per_second", peak, direction=direction)
+
+        if speedtest.pace_rate:
+            add("fast_pace_held", int(speedtest.pace_held(speed)), direction=direction)
+
+        add(
+            "fast_transferred_bytes",
+            sum(getattr(ctx, attribute) for ctx in speedtest.ctxs),
+            direction=direction,
+        )
+
+        for n, ctx in enumerate(speedtest.ctxs):
+            latency = getattr(ctx, latency_attribute)
+
+            if not latency or ctx.family in speedtest.failed_families:
+                continue
+
+            labels = {"direction": direction, "connection": n}
+
+            if ctx.family in ADDRESS_FAMILIES:
+                labels["family"] = ADDRESS_FAMILIES[ctx.family]
+
+            if not private:
+                labels["target"] = ctx.name
+
+            add("fast_latency_seconds", latency, **labels)
+
+    for family in speedtest.family_sessions:
+        ctxs = speedtest.family_ctxs(family)
+
+        add(
+            "fast_family_available",
+            int(family not in speedtest.failed_families),
+            family=ADDRESS_FAMILIES[family],
+        )
+
+        for direction, speed in (
+            ("download", speedtest.download_speed_of(ctxs)),
+            ("upload", speedtest.upload_speed_of(ctxs)),
+        ):
+            add(
+                "fast_family_speed_bytes_per_second",
+                speed,
+                direction=direction,
+                family=ADDRESS_FAMILIES[family],
+            )
+
+    if speedtest.pace_rate:
+        add("fast_pace_target_bytes_per_second", speedtest.pace_rate)
+        add("fast_loaded_latency_seconds", speedtest.loaded_latency)
+        add("fast_jitter_seconds", speedtest.jitter)
+        add("fast_lost_probes", speedtest.lost_probes)
+
+    add("fast_event_loop_lag_seconds", speedtest.loop_lag)
+    add("fast_client_bound", int(speedtest.loop_lag > CLIENT_BOUND_LAG))
+
+    return samples
+
+
+class MetricsExporter:
+    """
+    Serve the metrics of the current and the last completed run in the
+    Prometheus text format.
+
+    Only the last run is retained, so scraping costs the same no matter
+    how many runs were done.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9516, private=False):
+        self.host = host
+        self.port = port
+        self.private = private
+
+        self.current: "FastClientSpeedtest | None" = None
+        self.last_samples = {}
+        self.last_success = None
+        self.runs = 0
+
+        self.runner = None
+
+    def start_run(self, speedtest: "FastClientSpeedtest"):
+        self.current = speedtest
+
+    def finish_run(self, success: bool = True):
+        if self.current is not None:
+            self.last_samples = collect_samples(self.current, "last", self.private)
+
+        self.current = None
+        self.last_success = success
+        self.runs += 1
+
+    def render(self):
+        samples = {}
+
+        for name, values in self.last_samples.items():
+            samples.setdefault(name, []).extend(values)
+
+        if self.current is not None:
+            for name, values in collect_samples(
+                self.current, "current", self.private
+            ).items():
+                samples.setdefault(name, []).extend(values)
+
+        samples["fast_run_in_progress"] = [({}, int(self.current is not None))]
+        samples["fast_runs_total"] = [({}, self.runs)]
+
+        if self.last_success is not None:
+            samples["fast_last_run_success"] = [({}, int(self.last_success))]
+
+        lines = []
+
+        for name, (kind, description) in METRICS.items():
+            if name not in samples:
+                continue
+
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} {kind}")
+
+            for labels, value in samples[name]:
+                lines.append(f"{name}{format_labels(labels)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    async def handle_metrics(self, request: "web.Request"):
+        return web.Response(
+            body=self.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE}
+        )
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+
+        await web.TCPSite(self.runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
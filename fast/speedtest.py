@@ -1,4 +1,5 @@
 import asyncio
+import socket
 from hashlib import md5
 from itertools import cycle
 
@@ -10,10 +11,26 @@ from rich.text import Text
 
 from .api import NFFastClient
 from .async_buffer import buffered_reader
-from .utils import ServerwiseContext, fetch_formatted_data, share
+from .utils import (
+    ADDRESS_FAMILIES,
+    DEFAULT_STRIPE_SIZE,
+    RANGE_OBJECT_SIZE,
+    RangeScheduler,
+    ServerwiseContext,
+    TokenBucket,
+    fetch_formatted_data,
+    host_family,
+    share,
+    with_range,
+)
+
+FAMILY_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, OSError)
 
 
 class FastClientSpeedtest:
+
+    pace_tolerance = 0.95
+
     def __init__(self, loop=None, session: "aiohttp.ClientSession" = None):
 
         self.loop = loop or asyncio.get_event_loop()
@@ -22,8 +39,30 @@ class FastClientSpeedtest:
         self.fastcom_client = NFFastClient(self.session)
         self.ctxs: "list[ServerwiseContext]" = []
 
+        self.loop_lag = 0.0
+
+        self.pace_rate = 0.0
+        self.bucket: "TokenBucket | None" = None
+
+        self.family_sessions: "dict[int, aiohttp.ClientSession]" = {}
+        self.failed_families: "dict[int, BaseException]" = {}
+        self.families_in_parallel = True
+
     async def poll_metrics(self, ctx: ServerwiseContext, sent: bool = False):
-        raise NotImplementedError()
+        now = self.loop.time()
+
+        if sent:
+            ctx.last_bytes_sent_poll = now
+            speed = self.upload_speed
+
+            if ctx.peak_send_rate[1] < speed:
+                ctx.peak_send_rate = now - ctx.bytes_sent_start, speed
+        else:
+            ctx.last_bytes_recv_poll = now
+            speed = self.download_speed
+
+            if ctx.peak_recv_rate[1] < speed:
+                ctx.peak_recv_rate = now - ctx.bytes_recv_start, speed
 
     async def reset_metrics(self):
         raise NotImplementedError()
@@ -31,64 +70,202 @@ class FastClientSpeedtest:
     async def finalise_metrics(self):
         raise NotImplementedError()
 
-    @property
-    def download_speed(self):
+    @staticmethod
+    def download_speed_of(ctxs: "list[ServerwiseContext]"):
         return sum(
             (ctx.bytes_recv / (ctx.last_bytes_recv_poll - ctx.bytes_recv_start))
             if ctx.bytes_recv_start
             and (ctx.last_bytes_recv_poll - ctx.bytes_recv_start)
             else 0
-            for ctx in self.ctxs
+            for ctx in ctxs
         )
 
-    @property
-    def upload_speed(self):
+    @staticmethod
+    def upload_speed_of(ctxs: "list[ServerwiseContext]"):
         return sum(
             (ctx.bytes_sent / (ctx.last_bytes_sent_poll - ctx.bytes_sent_start))
             if ctx.bytes_sent_start
             and (ctx.last_bytes_sent_poll - ctx.bytes_sent_start)
             else 0
-            for ctx in self.ctxs
+            for ctx in ctxs
         )
 
+    @property
+    def download_speed(self):
+        # Families measured one after another never overlapped, so their
+        # rates cannot be added up.
+        if self.family_sessions and not self.families_in_parallel:
+            return max(
+                (
+                    self.download_speed_of(self.family_ctxs(family))
+                    for family in self.family_sessions
+                    if family not in self.failed_families
+                ),
+                default=0,
+            )
+
+        return self.download_speed_of(self.reported_ctxs)
+
+    @property
+    def upload_speed(self):
+        if self.family_sessions and not self.families_in_parallel:
+            return max(
+                (
+                    self.upload_speed_of(self.family_ctxs(family))
+                    for family in self.family_sessions
+                    if family not in self.failed_families
+                ),
+                default=0,
+            )
+
+        return self.upload_speed_of(self.reported_ctxs)
+
+    @property
+    def reported_ctxs(self):
+        """Contexts of address families that did not fail."""
+        return [ctx for ctx in self.ctxs if ctx.family not in self.failed_families]
+
+    def family_ctxs(self, family: int):
+        return [ctx for ctx in self.ctxs if ctx.family == family]
+
+    def session_for(self, ctx: ServerwiseContext):
+        return self.family_sessions.get(ctx.family, self.session)
+
+    def measured_ctxs(self, latency_attribute: str, ctxs=None):
+        """Contexts that completed a request timed by `latency_attribute`."""
+        return [
+            ctx
+            for ctx in (self.reported_ctxs if ctxs is None else ctxs)
+            if getattr(ctx, latency_attribute)
+        ]
+
     @property
     def lowest_latency(self):
-        return (
+        latency_attribute = (
+            "download_latency" if self.download_speed else "upload_latency"
+        )
+
+        return min(
             (
-                min(ctx.download_latency for ctx in self.ctxs)
-                if self.download_speed
-                else min(ctx.upload_latency for ctx in self.ctxs)
-            )
-            if self.ctxs
-            else 0
+                getattr(ctx, latency_attribute)
+                for ctx in self.measured_ctxs(latency_attribute)
+            ),
+            default=0,
         )
 
+    @property
+    def peak_download_speed(self):
+        return max((ctx.peak_recv_rate[1] for ctx in self.reported_ctxs), default=0.0)
+
+    @property
+    def peak_upload_speed(self):
+        return max((ctx.peak_send_rate[1] for ctx in self.reported_ctxs), default=0.0)
+
+    @property
+    def loaded_latency(self):
+        latencies = [
+            latency for ctx in self.reported_ctxs for latency in ctx.loaded_latencies
+        ]
+        return sum(latencies) / len(latencies) if latencies else 0.0
+
+    @property
+    def jitter(self):
+        jitters = [
+            ctx.jitter for ctx in self.reported_ctxs if len(ctx.loaded_latencies) > 1
+        ]
+        return sum(jitters) / len(jitters) if jitters else 0.0
+
+    def pace_held(self, speed: float):
+        return bool(self.pace_rate) and speed >= self.pace_rate * self.pace_tolerance
+
+    @property
+    def lost_probes(self):
+        return sum(ctx.lost_probes for ctx in self.ctxs)
+
+    async def probe_latency(
+        self,
+        ctx: ServerwiseContext,
+        while_,
+        *,
+        interval: float = 0.5,
+        timeout: float = 2.0,
+    ):
+        while while_() and ctx.family not in self.failed_families:
+            probe_start = self.loop.time()
+
+            try:
+                async with self.session_for(ctx).get(
+                    with_range(ctx.url, 0, 0),
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    await response.read()
+                    ctx.loaded_latencies.append(self.loop.time() - probe_start)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                ctx.lost_probes += 1
+
+            await asyncio.sleep(interval)
+
+    async def watch_loop_lag(self, while_, *, interval: float = 0.05):
+        while while_():
+            scheduled_at = self.loop.time()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(
+                self.loop_lag, self.loop.time() - scheduled_at - interval
+            )
+
     async def download_into_ctx(
-        self, ctx: ServerwiseContext, size: int = 26214400, time_limit: float = 10.0
+        self,
+        ctx: ServerwiseContext,
+        scheduler: RangeScheduler,
+        time_limit: float = 10.0,
     ):
         ctx.bytes_recv_start = self.loop.time()
         upto = ctx.bytes_recv_start + time_limit
 
-        for _ in range((size // 26214400) + 1):
+        stripe = scheduler.claim()
+
+        while stripe is not None:
+            start, end = stripe
+
+            if self.loop.time() > upto:
+                scheduler.release(start, end - start + 1)
+                return
+
             byte_recv_loop_time = self.loop.time()
             byte_recv_local = 0
+            stripe_size = end - start + 1
 
-            async with self.session.get(ctx.url) as response:
+            async with self.session_for(ctx).get(
+                with_range(ctx.url, start, end)
+            ) as response:
 
+                response.raise_for_status()
                 ctx.download_latency = self.loop.time() - byte_recv_loop_time
 
                 async for data in response.content.iter_chunked(1024):
 
-                    recv_length = len(data)
+                    recv_length = min(len(data), stripe_size - byte_recv_local)
 
                     ctx.bytes_recv += recv_length
                     byte_recv_local += recv_length
 
                     self.loop.create_task(self.poll_metrics(ctx))
 
-                    if self.loop.time() > upto or byte_recv_local >= size:
+                    if self.bucket is not None:
+                        await self.bucket.consume(recv_length, self.loop, until=upto)
+
+                    if self.loop.time() > upto:
                         return
 
+                    if byte_recv_local >= stripe_size:
+                        break
+
+            if not byte_recv_local:
+                return
+
+            scheduler.release(start + byte_recv_local, stripe_size - byte_recv_local)
+            stripe = scheduler.claim()
+
     async def upload_into_ctx(
         self, ctx: ServerwiseContext, size: int = 26214400, time_limit: float = 10.0
     ):
@@ -98,8 +275,8 @@ class FastClientSpeedtest:
         future = asyncio.Future()
 
         task = self.loop.create_task(
-            self.session.post(
-                ctx.url,
+            self.session_for(ctx).post(
+                with_range(ctx.url, 0, RANGE_OBJECT_SIZE),
                 data=buffered_reader(
                     ctx,
                     size,
@@ -107,6 +284,7 @@ class FastClientSpeedtest:
                     self.loop,
                     future,
                     poll=self.poll_metrics,
+                    bucket=self.bucket,
                 ),
                 headers={
                     "Content-Length": str(size),
@@ -114,9 +292,54 @@ class FastClientSpeedtest:
             ).__aenter__()
         )
 
+        def propagate_failure(task: asyncio.Task):
+            if not (future.done() or task.cancelled()) and task.exception():
+                future.set_exception(task.exception())
+
+        task.add_done_callback(propagate_failure)
         future.add_done_callback(task.cancel)
         await future
 
+    async def targets_for_family(self, targets: list, family: int):
+        family_targets = [
+            target
+            for target in targets
+            if host_family(yarl.URL(target["url"]).host)
+            in (family, socket.AF_UNSPEC)
+        ]
+
+        if family_targets:
+            return family_targets
+
+        try:
+            data = await NFFastClient(self.family_sessions[family]).fetch_urls(
+                url_count=len(targets)
+            )
+        except FAMILY_ERRORS as error:
+            self.failed_families[family] = error
+            return []
+
+        return data["targets"]
+
+    async def run_family_phase(self, family: int, into):
+        if family in self.failed_families:
+            return
+
+        tasks = [self.loop.create_task(into(ctx)) for ctx in self.family_ctxs(family)]
+
+        if not self.family_sessions:
+            return await asyncio.gather(*tasks)
+
+        try:
+            await asyncio.gather(*tasks)
+        except FAMILY_ERRORS as error:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+            self.failed_families[family] = error
+
     async def run(
         self,
         targets: list,
@@ -126,8 +349,12 @@ class FastClientSpeedtest:
         *,
         download_size: int = 26214400,
         download_time_limit: float = 10.0,
+        download_stripe_size: int = DEFAULT_STRIPE_SIZE,
         upload_size: int = 26214400,
         upload_time_limit: float = 10.0,
+        rate_limit: float = 0.0,
+        families: "tuple[int, ...]" = (),
+        families_in_parallel: bool = True,
     ):
 
         if not do_download and not do_upload:
@@ -135,45 +362,108 @@ class FastClientSpeedtest:
                 "You need to specify at least one of do_download and do_upload."
             )
 
-        assigned = 0
-        target_cycle = cycle(targets)
+        self.families_in_parallel = families_in_parallel
 
-        while assigned < connections:
-            target = next(target_cycle)
+        running = True
+        probes = []
 
-            parsed_url = yarl.URL(target["url"])
+        try:
+            for family in families:
+                self.family_sessions[family] = aiohttp.ClientSession(
+                    loop=self.loop, connector=aiohttp.TCPConnector(family=family)
+                )
 
-            parsed_url = parsed_url.with_path(
-                parsed_url.path + f"/range/0-26214400"
-            ).with_query(parsed_url.query)
+            for family in families or (socket.AF_UNSPEC,):
+                family_targets = targets
 
-            ctx = ServerwiseContext(
-                name=", ".join(target["location"].values()),
-                url=parsed_url,
-                bytes_recv_span=download_time_limit,
-                bytes_sent_span=upload_time_limit,
-            )
+                if families:
+                    family_targets = await self.targets_for_family(targets, family)
 
-            self.ctxs.append(ctx)
-            assigned += 1
+                    if not family_targets:
+                        continue
 
-        if do_download:
-            await asyncio.gather(
-                *(
-                    self.download_into_ctx(ctx, download_size, download_time_limit)
-                    for ctx in self.ctxs
-                )
-            )
+                assigned = 0
+                target_cycle = cycle(family_targets)
+
+                while assigned < connections:
+                    target = next(target_cycle)
+
+                    ctx = ServerwiseContext(
+                        name=", ".join(target["location"].values()),
+                        url=yarl.URL(target["url"]),
+                        family=family,
+                        bytes_recv_span=download_time_limit,
+                        bytes_sent_span=upload_time_limit,
+                    )
+
+                    self.ctxs.append(ctx)
+                    assigned += 1
+
+            if families and not families_in_parallel:
+                phases = [(family,) for family in families]
+            else:
+                phases = [families or (socket.AF_UNSPEC,)]
 
-        if do_upload:
-            await asyncio.gather(
-                *(
-                    self.upload_into_ctx(ctx, upload_size, upload_time_limit)
+            self.loop.create_task(self.watch_loop_lag(lambda: running))
+
+            if rate_limit:
+                self.pace_rate = rate_limit
+                self.bucket = TokenBucket(rate_limit, max(rate_limit / 10, 1024))
+
+                probes = [
+                    self.loop.create_task(self.probe_latency(ctx, lambda: running))
                     for ctx in self.ctxs
-                )
-            )
+                ]
+
+            if do_download:
+                split, remainder = divmod(download_size, len(families) or 1)
+
+                schedulers = {
+                    family: RangeScheduler(
+                        split + (n < remainder), download_stripe_size
+                    )
+                    for n, family in enumerate(families or (socket.AF_UNSPEC,))
+                }
+
+                for phase in phases:
+                    await asyncio.gather(
+                        *(
+                            self.run_family_phase(
+                                family,
+                                lambda ctx: self.download_into_ctx(
+                                    ctx, schedulers[ctx.family], download_time_limit
+                                ),
+                            )
+                            for family in phase
+                        )
+                    )
+
+            if do_upload:
+                for phase in phases:
+                    await asyncio.gather(
+                        *(
+                            self.run_family_phase(
+                                family,
+                                lambda ctx: self.upload_into_ctx(
+                                    ctx, upload_size, upload_time_limit
+                                ),
+                            )
+                            for family in phase
+                        )
+                    )
+        finally:
+            running = False
+
+            for probe in probes:
+                probe.cancel()
+
+            await asyncio.gather(*probes, return_exceptions=True)
+
+            for session in self.family_sessions.values():
+                await session.close()
+
+            await self.session.close()
 
-        await self.session.close()
         await self.finalise_metrics()
 
 
@@ -203,11 +493,7 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
         super().__init__(loop, session)
 
     async def poll_metrics(self, ctx: ServerwiseContext, sent: bool = False):
-
-        if sent:
-            ctx.last_bytes_sent_poll = self.loop.time()
-        else:
-            ctx.last_bytes_recv_poll = self.loop.time()
+        await super().poll_metrics(ctx, sent)
 
         if self.active_live is None:
             self.active_live = Live(console=self.console, auto_refresh=True).__enter__()
@@ -234,24 +520,6 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
             else (ctx.bytes_recv_span - (now - ctx.bytes_recv_start))
         )
 
-        if sent:
-
-            db_by_dt = self.upload_speed
-
-            _, peak_send_rate = ctx.peak_send_rate
-            if peak_send_rate < db_by_dt:
-                ctx.peak_send_rate = now - ctx.bytes_sent_start, db_by_dt
-
-        else:
-            db_by_dt = self.download_speed
-
-            _, peak_recv_rate = ctx.peak_recv_rate
-            if peak_recv_rate < db_by_dt:
-                ctx.peak_recv_rate = now - ctx.bytes_recv_start, db_by_dt
-
-        if self.bits:
-            db_by_dt *= 8
-
         speed_data = []
 
         if self.download_speed:
@@ -285,6 +553,34 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
 
         self.active_live.update(" ".join(speed_data) + suffix)
 
+    def format_family(self, family: int):
+        if family in self.failed_families:
+            return f"{ADDRESS_FAMILIES[family]}: unavailable."
+
+        ctxs = self.family_ctxs(family)
+        family_data = []
+
+        for direction, speed, latency_attribute in (
+            ("download", self.download_speed_of(ctxs), "download_latency"),
+            ("upload", self.upload_speed_of(ctxs), "upload_latency"),
+        ):
+            if not speed:
+                continue
+
+            latencies = [
+                getattr(ctx, latency_attribute)
+                for ctx in self.measured_ctxs(latency_attribute, ctxs)
+            ]
+
+            family_data.append(
+                f"{self.signs[direction]} {humanize.naturalsize(speed * (8 if self.bits else 1), binary=self.bits)}/s"
+                f" ({sum(latencies) / len(latencies) * 1000:.2f} ms)"
+            )
+
+        return f"{ADDRESS_FAMILIES[family]}: " + (
+            " ".join(family_data) or "Nothing to report."
+        )
+
     async def reset_metrics(self, update_with="\r"):
         if self.active_live is not None:
             self.active_live.update(update_with)
@@ -293,23 +589,32 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
 
     async def finalise_metrics(self):
         if not (self.download_speed or self.upload_speed):
-            return await self.reset_metrics("Nothing to report.")
+            await self.reset_metrics("Nothing to report.")
+
+            if not self.less_verbose:
+                for family in self.family_sessions:
+                    self.console.print(self.format_family(family))
+
+            return
 
         speed_data = []
         traffic_data = []
 
         latency_data = []
+        pacing_data = []
         lowest_latency = 0
 
         if self.download_speed:
 
-            lowest_latency = min(self.ctxs, key=lambda ctx: ctx.download_latency)
-            highest_latency = max(self.ctxs, key=lambda ctx: ctx.download_latency)
-            average_latency = sum(ctx.download_latency for ctx in self.ctxs) / len(
-                self.ctxs
+            measured = self.measured_ctxs("download_latency")
+
+            lowest_latency = min(measured, key=lambda ctx: ctx.download_latency)
+            highest_latency = max(measured, key=lambda ctx: ctx.download_latency)
+            average_latency = sum(ctx.download_latency for ctx in measured) / len(
+                measured
             )
             peak_at, peak = max(
-                (ctx.peak_recv_rate for ctx in self.ctxs), key=lambda x: x[1]
+                (ctx.peak_recv_rate for ctx in self.reported_ctxs), key=lambda x: x[1]
             )
             total = sum(ctx.bytes_recv for ctx in self.ctxs)
 
@@ -333,15 +638,24 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
             speed_data.append(data.speed)
             traffic_data.append(data.traffic)
 
+            if self.pace_rate:
+                pacing_data.append(
+                    f"{self.signs['download']} "
+                    + ("held" if self.pace_held(self.download_speed) else "not held")
+                    + f" ({self.download_speed / self.pace_rate * 100:.1f}% of target)"
+                )
+
         if self.upload_speed:
 
-            lowest_latency = min(self.ctxs, key=lambda ctx: ctx.upload_latency)
-            highest_latency = max(self.ctxs, key=lambda ctx: ctx.upload_latency)
-            average_latency = sum(ctx.upload_latency for ctx in self.ctxs) / len(
-                self.ctxs
+            measured = self.measured_ctxs("upload_latency")
+
+            lowest_latency = min(measured, key=lambda ctx: ctx.upload_latency)
+            highest_latency = max(measured, key=lambda ctx: ctx.upload_latency)
+            average_latency = sum(ctx.upload_latency for ctx in measured) / len(
+                measured
             )
             peak_at, peak = max(
-                (ctx.peak_send_rate for ctx in self.ctxs), key=lambda x: x[1]
+                (ctx.peak_send_rate for ctx in self.reported_ctxs), key=lambda x: x[1]
             )
             total = sum(ctx.bytes_sent for ctx in self.ctxs)
 
@@ -365,6 +679,13 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
             speed_data.append(data.speed)
             traffic_data.append(data.traffic)
 
+            if self.pace_rate:
+                pacing_data.append(
+                    f"{self.signs['upload']} "
+                    + ("held" if self.pace_held(self.upload_speed) else "not held")
+                    + f" ({self.upload_speed / self.pace_rate * 100:.1f}% of target)"
+                )
+
         await self.reset_metrics(Text(" ".join(speed_data)))
 
         if not self.less_verbose:
@@ -379,6 +700,24 @@ class FastClientSpeedTestRich(FastClientSpeedtest):
             for line in traffic_data:
                 self.console.print("\t" + line)
 
+            if self.family_sessions:
+                self.console.print("Address families:")
+
+                for family in self.family_sessions:
+                    self.console.print("\t" + self.format_family(family))
+
+            if self.pace_rate:
+                self.console.print(
+                    f"Pacing (target: {humanize.naturalsize(self.pace_rate * (8 if self.bits else 1), binary=self.bits)}/s):"
+                )
+
+                for line in pacing_data:
+                    self.console.print("\t" + line)
+
+                self.console.print(
+                    f"\tlatency under load: {self.loaded_latency * 1000:.2f} ms (jitter: {self.jitter * 1000:.2f} ms, lost probes: {self.lost_probes})"
+                )
+
         if self.share:
             self.console.print(
                 f"Shareable url: {await share(self.download_speed, self.upload_speed, self.lowest_latency, private_mode=self.private)}"
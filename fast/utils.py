@@ -1,4 +1,6 @@
+import asyncio
 import dataclasses
+import socket
 from collections import namedtuple
 from hashlib import md5
 
@@ -9,6 +11,19 @@ import yarl
 SPEEDTEST_NET_BASE = "https://www.speedtest.net/"
 SPEEDTEST_NY_SERVER_ID = 10562
 
+RANGE_OBJECT_SIZE = 26214400
+DEFAULT_STRIPE_SIZE = 4194304
+
+ADDRESS_FAMILIES = {
+    socket.AF_INET: "IPv4",
+    socket.AF_INET6: "IPv6",
+}
+
+FAMILY_HOST_PREFIXES = {
+    "ipv4-": socket.AF_INET,
+    "ipv6-": socket.AF_INET6,
+}
+
 
 formatted_speedtest_data = namedtuple(
     "formatted_speedtest_data", ("latency", "speed", "traffic")
@@ -21,6 +36,8 @@ class ServerwiseContext:
     name: str
     url: yarl.URL
 
+    family: int = socket.AF_UNSPEC
+
     download_latency: float = 0.0
     upload_latency: float = 0.0
 
@@ -39,6 +56,118 @@ class ServerwiseContext:
     peak_recv_rate: tuple[float, float] = 0.0, 0.0
     peak_send_rate: tuple[float, float] = 0.0, 0.0
 
+    loaded_latencies: list = dataclasses.field(default_factory=list)
+    lost_probes: int = 0
+
+    @property
+    def jitter(self):
+        return (
+            sum(
+                abs(current - previous)
+                for previous, current in zip(
+                    self.loaded_latencies, self.loaded_latencies[1:]
+                )
+            )
+            / (len(self.loaded_latencies) - 1)
+            if len(self.loaded_latencies) > 1
+            else 0.0
+        )
+
+
+@dataclasses.dataclass
+class TokenBucket:
+    """Pace byte transfers to `rate` bytes per second, bursting up to `capacity` bytes.
+
+    A single bucket is shared by every connection, so the rate holds globally.
+    Waiting never extends past `until`, so pacing cannot overrun a time limit.
+    """
+
+    rate: float
+    capacity: float
+
+    tokens: float = 0.0
+    updated_at: float = 0.0
+
+    async def consume(
+        self, amount: int, loop: asyncio.AbstractEventLoop, until: float = None
+    ):
+        now = loop.time()
+
+        if self.updated_at:
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.updated_at) * self.rate
+            )
+        else:
+            self.tokens = self.capacity
+
+        self.updated_at = now
+
+        self.tokens -= amount
+
+        if self.tokens < 0:
+            delay = -self.tokens / self.rate
+
+            if until is not None:
+                delay = min(delay, max(until - now, 0.0))
+
+            await asyncio.sleep(delay)
+
+
+@dataclasses.dataclass
+class RangeScheduler:
+    """Hand out range stripes from a global download byte budget.
+
+    Stripes are claimed by whichever connection asks first, so faster
+    connections end up carrying more of the budget. Stripes that were cut
+    short are released and handed out again before any new stripe.
+    """
+
+    budget: int
+    stripe_size: int = DEFAULT_STRIPE_SIZE
+
+    claimed: int = 0
+    released: list = dataclasses.field(default_factory=list)
+
+    @property
+    def remaining(self) -> int:
+        return self.budget - self.claimed
+
+    def claim(self):
+        """Claim the next stripe as an inclusive `(start, end)` range or `None` once the budget is spent."""
+        if self.released:
+            return self.released.pop()
+
+        length = min(self.stripe_size, self.remaining, RANGE_OBJECT_SIZE)
+
+        if length <= 0:
+            return None
+
+        start = self.claimed % RANGE_OBJECT_SIZE
+
+        if start + length > RANGE_OBJECT_SIZE:
+            start = 0
+
+        self.claimed += length
+        return start, start + length - 1
+
+    def release(self, start: int, remaining: int):
+        """Return the unreceived `remaining` bytes of a stripe from `start` onwards."""
+        if remaining > 0:
+            self.released.append((start, start + remaining - 1))
+
+
+def host_family(host: str) -> int:
+    """Guess the address family a target host is limited to from its name."""
+    for prefix, family in FAMILY_HOST_PREFIXES.items():
+        if (host or "").startswith(prefix):
+            return family
+
+    return socket.AF_UNSPEC
+
+
+def with_range(url: yarl.URL, start: int, end: int) -> yarl.URL:
+    return url.with_path(url.path + f"/range/{start}-{end}").with_query(url.query)
+
 
 async def share(download_rate, upload_rate, ping, private_mode=False) -> None:
     """Share the results of a speedtest."""
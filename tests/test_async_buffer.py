@@ -0,0 +1,29 @@
+import asyncio
+
+import yarl
+
+from fast.async_buffer import buffered_reader
+from fast.utils import ServerwiseContext, TokenBucket
+
+
+def test_pacing_is_not_upload_latency():
+    async def main():
+        loop = asyncio.get_running_loop()
+        ctx = ServerwiseContext(
+            "X", yarl.URL("https://localhost/speedtest"), bytes_sent_span=5.0
+        )
+
+        bucket = TokenBucket(10240, 1024, tokens=-2048, updated_at=loop.time())
+        future = loop.create_future()
+
+        async for _ in buffered_reader(
+            ctx, 4096, loop.time(), loop, future, bucket=bucket
+        ):
+            pass
+
+        return ctx
+
+    ctx = asyncio.run(main())
+
+    assert ctx.bytes_sent == 4096
+    assert 0 < ctx.upload_latency < 0.1
@@ -0,0 +1,97 @@
+import asyncio
+
+import yarl
+
+from fast.exporter import MetricsExporter
+from fast.speedtest import FastClientSpeedtest
+from fast.utils import ServerwiseContext
+
+
+def speedtest_with(*ctxs: ServerwiseContext):
+    async def main():
+        speedtest = FastClientSpeedtest()
+        await speedtest.session.close()
+
+        speedtest.ctxs = list(ctxs)
+        return speedtest
+
+    return asyncio.run(main())
+
+
+def downloaded_ctx(name: str, bytes_recv: int, latency: float):
+    return ServerwiseContext(
+        name=name,
+        url=yarl.URL("https://localhost/speedtest"),
+        download_latency=latency,
+        bytes_recv=bytes_recv,
+        bytes_recv_start=1.0,
+        last_bytes_recv_poll=2.0,
+        peak_recv_rate=(0.5, bytes_recv * 2),
+    )
+
+
+def test_failed_run_is_reported():
+    speedtest = speedtest_with()
+    exporter = MetricsExporter()
+
+    exporter.start_run(speedtest)
+    assert "fast_run_in_progress 1" in exporter.render()
+
+    exporter.finish_run(success=False)
+    metrics = exporter.render()
+
+    assert exporter.current is None
+    assert "fast_run_in_progress 0" in metrics
+    assert "fast_last_run_success 0" in metrics
+    assert "fast_runs_total 1" in metrics
+    assert 'fast_speed_bytes_per_second{run="last",direction="download"} 0' in metrics
+
+
+def test_current_and_last_runs_are_rendered():
+    exporter = MetricsExporter()
+
+    exporter.start_run(
+        speedtest_with(
+            downloaded_ctx("Oslo, NO", 100, 0.01),
+            downloaded_ctx("Paris, FR", 300, 0.02),
+        )
+    )
+    exporter.finish_run()
+
+    exporter.start_run(speedtest_with(downloaded_ctx("Oslo, NO", 50, 0.03)))
+    metrics = exporter.render().splitlines()
+
+    assert 'fast_speed_bytes_per_second{run="last",direction="download"} 400.0' in metrics
+    assert (
+        'fast_speed_bytes_per_second{run="current",direction="download"} 50.0'
+        in metrics
+    )
+    assert 'fast_peak_speed_bytes_per_second{run="last",direction="download"} 600' in metrics
+    assert 'fast_transferred_bytes{run="current",direction="download"} 50' in metrics
+    assert (
+        'fast_latency_seconds{run="last",direction="download",connection="1",target="Paris, FR"} 0.02'
+        in metrics
+    )
+    assert (
+        'fast_latency_seconds{run="current",direction="download",connection="0",target="Oslo, NO"} 0.03'
+        in metrics
+    )
+    assert not any(
+        line.startswith('fast_latency_seconds{run="last",direction="upload"')
+        for line in metrics
+    )
+    assert metrics.count("# TYPE fast_latency_seconds gauge") == 1
+    assert "fast_run_in_progress 1" in metrics
+
+
+def test_private_mode_drops_targets():
+    exporter = MetricsExporter(private=True)
+    exporter.start_run(speedtest_with(downloaded_ctx("Oslo, NO", 100, 0.01)))
+
+    metrics = exporter.render()
+
+    assert (
+        'fast_latency_seconds{run="current",direction="download",connection="0"} 0.01'
+        in metrics
+    )
+    assert "Oslo" not in metrics
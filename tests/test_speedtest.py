@@ -0,0 +1,163 @@
+import asyncio
+import socket
+
+import aiohttp
+import pytest
+import yarl
+from aiohttp import web
+
+from fast.speedtest import FastClientSpeedtest
+from fast.utils import RangeScheduler, ServerwiseContext
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get("/speedtest/range/{range}", handler)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+
+    host, port = runner.addresses[0][:2]
+    return runner, yarl.URL(f"http://{host}:{port}/speedtest")
+
+
+def download(handler, budget: int, connections: int = 1, stripe_size: int = 1000):
+    requests = []
+
+    async def counted(request: "web.Request"):
+        requests.append(request.match_info["range"])
+        return await handler(request)
+
+    async def main():
+        runner, url = await serve(counted)
+        speedtest = FastClientSpeedtest()
+        scheduler = RangeScheduler(budget, stripe_size)
+
+        speedtest.ctxs = [ServerwiseContext("X", url) for _ in range(connections)]
+
+        try:
+            await asyncio.gather(
+                *(
+                    speedtest.download_into_ctx(ctx, scheduler, 5.0)
+                    for ctx in speedtest.ctxs
+                )
+            )
+        finally:
+            await speedtest.session.close()
+            await runner.cleanup()
+
+        return speedtest
+
+    return asyncio.run(main()), requests
+
+
+async def full_range(request: "web.Request"):
+    start, end = map(int, request.match_info["range"].split("-"))
+    return web.Response(body=b"0" * (end - start + 1))
+
+
+def family_ctx(family: int, bytes_recv: int):
+    return ServerwiseContext(
+        name="X",
+        url=yarl.URL("https://localhost/speedtest"),
+        family=family,
+        bytes_recv=bytes_recv,
+        bytes_recv_start=1.0,
+        last_bytes_recv_poll=2.0,
+    )
+
+
+def download_speed(families_in_parallel: bool):
+    async def main():
+        speedtest = FastClientSpeedtest()
+        await speedtest.session.close()
+
+        speedtest.family_sessions = {socket.AF_INET: None, socket.AF_INET6: None}
+        speedtest.families_in_parallel = families_in_parallel
+        speedtest.ctxs = [
+            family_ctx(socket.AF_INET, 100),
+            family_ctx(socket.AF_INET, 100),
+            family_ctx(socket.AF_INET6, 150),
+        ]
+
+        return speedtest.download_speed
+
+    return asyncio.run(main())
+
+
+def test_parallel_families_add_up():
+    assert download_speed(True) == 350
+
+
+def test_sequential_families_do_not_add_up():
+    assert download_speed(False) == 200
+
+
+def test_download_fails_on_error_status():
+    async def forbidden(request: "web.Request"):
+        return web.Response(status=403)
+
+    with pytest.raises(aiohttp.ClientResponseError):
+        download(forbidden, 10000)
+
+
+def test_download_stops_without_progress():
+    async def half_range(request: "web.Request"):
+        start, end = map(int, request.match_info["range"].split("-"))
+        return web.Response(body=b"0" * ((end - start + 1) // 2))
+
+    speedtest, requests = download(half_range, 1000)
+
+    assert requests[:3] == ["0-999", "500-999", "750-999"]
+    assert len(requests) <= 11
+    assert speedtest.ctxs[0].bytes_recv == 999
+
+
+def test_download_stops_exactly_at_budget():
+    speedtest, requests = download(full_range, 10001, connections=3)
+
+    assert sum(ctx.bytes_recv for ctx in speedtest.ctxs) == 10001
+    assert len(requests) == 11
+
+
+def test_idle_connections_are_not_measured():
+    speedtest, _ = download(full_range, 1000, connections=3)
+
+    measured = speedtest.measured_ctxs("download_latency")
+
+    assert len(measured) == 1
+    assert speedtest.lowest_latency == measured[0].download_latency > 0
+
+
+def test_engine_tracks_peak_speed():
+    speedtest, _ = download(full_range, 10001, connections=2)
+
+    assert speedtest.download_speed > 0
+    assert speedtest.peak_download_speed > 0
+
+
+def test_failed_family_is_counted_but_not_measured():
+    async def main():
+        speedtest = FastClientSpeedtest()
+        await speedtest.session.close()
+
+        failed = family_ctx(socket.AF_INET6, 150)
+        failed.download_latency = 0.001
+
+        working = family_ctx(socket.AF_INET, 100)
+        working.download_latency = 0.02
+
+        speedtest.family_sessions = {socket.AF_INET: None, socket.AF_INET6: None}
+        speedtest.failed_families = {socket.AF_INET6: OSError()}
+        speedtest.ctxs = [working, failed]
+
+        return speedtest
+
+    speedtest = asyncio.run(main())
+
+    assert speedtest.download_speed == 100
+    assert speedtest.lowest_latency == 0.02
+    assert sum(ctx.bytes_recv for ctx in speedtest.ctxs) == 250
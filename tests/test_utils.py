@@ -0,0 +1,113 @@
+import asyncio
+import socket
+
+from fast.utils import RANGE_OBJECT_SIZE, RangeScheduler, TokenBucket, host_family
+
+
+def claim_all(scheduler: RangeScheduler):
+    stripes = []
+    stripe = scheduler.claim()
+
+    while stripe is not None:
+        stripes.append(stripe)
+        stripe = scheduler.claim()
+
+    return stripes
+
+
+def stripe_length(stripe):
+    start, end = stripe
+    return end - start + 1
+
+
+def test_claim_uneven_budget():
+    stripes = claim_all(RangeScheduler(10000001, 4194304))
+
+    assert [stripe_length(stripe) for stripe in stripes] == [
+        4194304,
+        4194304,
+        1611393,
+    ]
+    assert stripes[0] == (0, 4194303)
+    assert stripes[1] == (4194304, 8388607)
+
+
+def test_claim_wraps_past_object_size():
+    stripe_size = 10000000
+    stripes = claim_all(RangeScheduler(RANGE_OBJECT_SIZE * 2, stripe_size))
+
+    assert sum(map(stripe_length, stripes)) == RANGE_OBJECT_SIZE * 2
+    assert all(0 <= start <= end < RANGE_OBJECT_SIZE for start, end in stripes)
+    assert stripes[2] == (0, stripe_size - 1)
+
+
+def test_claim_caps_stripe_at_object_size():
+    stripes = claim_all(RangeScheduler(RANGE_OBJECT_SIZE + 1, RANGE_OBJECT_SIZE * 2))
+
+    assert stripes == [(0, RANGE_OBJECT_SIZE - 1), (0, 0)]
+
+
+def test_release_is_claimed_again():
+    scheduler = RangeScheduler(100, 40)
+
+    start, end = scheduler.claim()
+    scheduler.release(start + 15, end - start + 1 - 15)
+
+    assert scheduler.claim() == (15, 39)
+    assert sum(map(stripe_length, claim_all(scheduler))) == 60
+
+
+def test_release_nothing():
+    scheduler = RangeScheduler(10, 10)
+    scheduler.claim()
+    scheduler.release(10, 0)
+
+    assert scheduler.claim() is None
+
+
+def test_consume_never_sleeps_past_until():
+    async def main():
+        loop = asyncio.get_running_loop()
+        bucket = TokenBucket(1, 1024)
+
+        await bucket.consume(1024, loop)
+
+        started_at = loop.time()
+        await bucket.consume(1024, loop, until=started_at + 0.1)
+
+        return loop.time() - started_at
+
+    assert asyncio.run(main()) < 1
+
+
+def test_host_family():
+    assert host_family("ipv4-c001-example.oca.nflxvideo.net") == socket.AF_INET
+    assert host_family("ipv6-c001-example.oca.nflxvideo.net") == socket.AF_INET6
+    assert host_family("example.oca.nflxvideo.net") == socket.AF_UNSPEC
+    assert host_family(None) == socket.AF_UNSPEC
+
+
+def test_shared_bucket_holds_rate():
+    rate = 200000
+    chunk_size = 1024
+
+    async def main():
+        loop = asyncio.get_running_loop()
+        bucket = TokenBucket(rate, chunk_size)
+
+        consumed = []
+        started_at = loop.time()
+        until = started_at + 0.5
+
+        async def consumer():
+            while loop.time() < until:
+                await bucket.consume(chunk_size, loop)
+                consumed.append(chunk_size)
+
+        await asyncio.gather(*(consumer() for _ in range(4)))
+
+        return sum(consumed), loop.time() - started_at
+
+    total, elapsed = asyncio.run(main())
+
+    assert rate * elapsed * 0.9 <= total <= rate * elapsed + chunk_size * 5